@@ -1,6 +1,11 @@
 import asyncio
 import logging
-import traceback
+import os
+import tempfile
+import weakref
+from collections import deque
+from pathlib import Path
+
 from dotenv import load_dotenv
 
 from livekit import rtc
@@ -20,8 +25,13 @@ from livekit.agents import (
     utils,
 )
 from livekit.agents.tts import StreamAdapter
-from livekit.plugins import deepgram, silero, elevenlabs
-from livekit_agents_extensions.filler_interrupt_handler import FillerInterruptHandler
+from livekit.plugins import deepgram, elevenlabs
+from livekit_agents_extensions.batched_vad import BatchedVAD
+from livekit_agents_extensions.filler_interrupt_handler import (
+    CLASSIFY_FILLER_ONLY,
+    CLASSIFY_FORCE_STOP,
+    FillerInterruptHandler,
+)
 
 # ==============================================================
 # LOGGING SETUP
@@ -38,18 +48,32 @@ logger = logging.getLogger("transcriber")
 # ENHANCED AGENT: With interruption handling but SAME TTS approach
 # ==============================================================
 class Transcriber(Agent):
-    def __init__(self, *, participant_identity: str, tts=None, room_io=None, handler=None):
-        super().__init__(instructions="not-needed", stt=deepgram.STT(), tts=tts)
+    # Agent itself still carries a __dict__, but slotting our own attributes
+    # keeps them out of it and speeds up access on the hot interruption path.
+    __slots__ = (
+        "participant_identity",
+        "room_io",
+        "handler",
+        "_agent_session",
+        "_is_speaking",
+        "_speech_handle",
+    )
+
+    def __init__(self, *, participant_identity: str, stt=None, tts=None, room_io=None, handler=None):
+        super().__init__(instructions="not-needed", stt=stt, tts=tts)
         self.participant_identity = participant_identity
         self.room_io = room_io
         self.handler = handler
         self._agent_session = None
         self._is_speaking = False  # Track speaking state for interruptions
+        self._speech_handle = None
         logger.debug(f"[INIT] Transcriber created for {participant_identity}")
 
     async def stop_speaking(self):
         """Stop TTS immediately when interruption is detected"""
         self._is_speaking = False
+        if self._speech_handle and not self._speech_handle.done():
+            self._speech_handle.interrupt()
         logger.info(f"[INTERRUPTION] TTS stopped for {self.participant_identity}")
 
     async def on_user_turn_completed(self, chat_ctx: llm.ChatContext, new_message: llm.ChatMessage):
@@ -69,22 +93,23 @@ class Transcriber(Agent):
 
         try:
             if self.tts and self._agent_session and not self._is_speaking:
-                logger.debug(f"[TTS] Generating response for {self.participant_identity}: {response_text}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"[TTS] Generating response for {self.participant_identity}: {response_text}")
 
                 # Set speaking state BEFORE starting TTS
                 self._is_speaking = True
                 if self.handler:
                     await self.handler.set_agent_speaking(True)
 
-                # ✅ USE THE WORKING APPROACH: session.say() 
-                await self._agent_session.say(response_text)
-                
-                # Reset speaking state AFTER TTS completes
-                self._is_speaking = False
-                if self.handler:
-                    await self.handler.set_agent_speaking(False)
-                    
-                logger.info(f"[TTS] Finished speaking for {self.participant_identity}")
+                # say() streams synthesized audio progressively - first frames
+                # play while the rest is still being synthesized. Keep the
+                # handle instead of awaiting full playout so the turn returns
+                # immediately and interruptions can cut playback mid-stream.
+                self._speech_handle = self._agent_session.say(
+                    response_text, allow_interruptions=True, add_to_chat_ctx=False
+                )
+                self._speech_handle.add_done_callback(self._on_speech_done)
+                logger.info(f"[TTS] Streaming speech for {self.participant_identity}")
             else:
                 missing = []
                 if not self.tts: missing.append("tts")
@@ -92,37 +117,35 @@ class Transcriber(Agent):
                 if self._is_speaking: missing.append("already_speaking")
                 logger.warning(f"[TTS not available] Missing: {missing}. Response would be: {response_text}")
 
-        except Exception as e:
-            logger.error(f"[TTS ERROR] {e}")
-            traceback.print_exc()
+        except Exception:
+            logger.exception("[TTS ERROR]")
             self._is_speaking = False
             if self.handler:
                 await self.handler.set_agent_speaking(False)
 
         raise StopResponse()
 
+    def _on_speech_done(self, handle):
+        """Reset speaking state once playout finishes (or is interrupted)."""
+        self._is_speaking = False
+        self._speech_handle = None
+        if self.handler:
+            asyncio.create_task(self.handler.set_agent_speaking(False))
+        logger.info(f"[TTS] Finished speaking for {self.participant_identity}")
+
     async def _check_interruption(self, text: str) -> bool:
-        """Check if text should interrupt current speech - SIMPLE VERSION"""
+        """Check if text should interrupt current speech."""
         if not self.handler:
             return False
-            
-        text_lower = text.lower()
-        
-        # Check for force-stop words
-        force_stop_words = ["stop", "wait", "pause", "end", "terminate", "shut up", "be quiet", "halt"]
-        if any(stop in text_lower for stop in force_stop_words):
-            logger.info(f"[INTERRUPTION DETECTED] Force-stop word: '{text}'")
-            return True
-            
-        # Check if it's not just filler words
-        ignored_words = ["uh", "umm", "hmm", "haan", "uhh", "uhm"]
-        tokens = [t for t in text_lower.split() if t]
-        non_filler = [t for t in tokens if t not in ignored_words]
-        if non_filler:
-            logger.info(f"[INTERRUPTION DETECTED] Non-filler content: '{text}'")
-            return True
-            
-        return False
+
+        # Delegate to the handler's compiled matcher - single source of truth
+        result = self.handler.classify(text)
+        if result == CLASSIFY_FILLER_ONLY:
+            return False
+
+        reason = "Force-stop word" if result == CLASSIFY_FORCE_STOP else "Non-filler content"
+        logger.info(f"[INTERRUPTION DETECTED] {reason}: '{text}'")
+        return True
 
 
 # ==============================================================
@@ -134,6 +157,11 @@ class MultiUserTranscriber:
         self._sessions: dict[str, AgentSession] = {}
         self._agents: dict[str, Transcriber] = {}  # Track agents for interruption handling
         self._tasks: set[asyncio.Task] = set()
+        # Recycled handlers: join/leave churn reuses them (word sets and
+        # compiled matchers intact) instead of reallocating per participant.
+        self._handler_pool: deque = deque(maxlen=64)
+        # Per-participant (worker task, STT listener) pairs, torn down on leave
+        self._stt_listeners: dict[str, tuple] = {}
         logger.debug("[INIT] MultiUserTranscriber initialized.")
 
     # ==============================================================
@@ -160,6 +188,20 @@ class MultiUserTranscriber:
     def on_participant_disconnected(self, participant: rtc.RemoteParticipant):
         sess = self._sessions.pop(participant.identity, None)
         agent = self._agents.pop(participant.identity, None)
+        # Tear down this participant's transcript feed before the handler is
+        # pooled; a stale worker/listener would keep feeding the recycled
+        # handler another participant's speech.
+        entry = self._stt_listeners.pop(participant.identity, None)
+        if entry:
+            worker, listener = entry
+            worker.cancel()
+            off_transcript = self.ctx.proc.userdata.get("stt_off_transcript")
+            if off_transcript:
+                off_transcript(listener)
+        if agent and agent.handler:
+            agent.handler.reset()
+            self._handler_pool.append(agent.handler)
+            agent.handler = None
         if sess:
             logger.info(f"[ROOM] Participant left: {participant.identity}")
             asyncio.create_task(self._close_session(sess))
@@ -180,38 +222,45 @@ class MultiUserTranscriber:
             )
             await room_io.start()
 
-            # === Initialize ElevenLabs TTS ===
-            tts = None
-            try:
-                tts = elevenlabs.TTS(
-                    api_key="sk_bcdee9936c01b819ad9a831f44246d77d6ebd7ef998edb63",
-                    model="eleven_flash_v2_5"
-                )
-                logger.info(f"[TTS] ElevenLabs TTS ready for {participant.identity}")
-            except Exception as e:
-                logger.error(f"[TTS INIT ERROR] {e}")
-                traceback.print_exc()
-
-            # === Create interruption handler for this participant ===
-            handler = FillerInterruptHandler(
-                ignored_words=["uh", "umm", "hmm", "haan", "uhh", "uhm"],
-                force_stop_words=["stop", "wait", "pause", "end", "terminate", "shut up", "be quiet", "halt"],
-                ignore_if_confidence_below=0.35,
-            )
+            # === Shared STT/TTS clients (created once in prewarm) ===
+            stt = self.ctx.proc.userdata["stt"]
+            tts = self.ctx.proc.userdata.get("tts")
 
-            # Set up interruption callbacks
-            handler.on_valid_interruption(lambda t, m: self._handle_interruption(participant.identity, t, m))
-            handler.on_ignored_filler(lambda t, m: logger.debug(f"[IGNORED FILLER] {participant.identity}: {t}"))
-            handler.on_speech_registered(lambda t, m: logger.debug(f"[SPEECH REGISTERED] {participant.identity}: {t}"))
+            # === Interruption handler for this participant (pooled) ===
+            if self._handler_pool:
+                handler = self._handler_pool.popleft()
+            else:
+                handler = FillerInterruptHandler(
+                    ignored_words=["uh", "umm", "hmm", "haan", "uhh", "uhm"],
+                    force_stop_words=["stop", "wait", "pause", "end", "terminate", "shut up", "be quiet", "halt"],
+                    ignore_if_confidence_below=0.35,
+                )
 
             # Create the agent with handler
             transcriber_agent = Transcriber(
-                participant_identity=participant.identity, 
-                tts=tts, 
+                participant_identity=participant.identity,
+                stt=stt,
+                tts=tts,
                 room_io=room_io,
                 handler=handler
             )
-            
+
+            # Bind the interruption callback straight to the agent via a weakref:
+            # no dict lookup per interruption, and the callback never keeps a
+            # disconnected agent alive.
+            agent_ref = weakref.ref(transcriber_agent)
+
+            def _on_valid_interruption(text, meta, _ref=agent_ref):
+                agent = _ref()
+                if agent is not None:
+                    logger.info(f"[INTERRUPTION HANDLER] Stopping TTS for {agent.participant_identity}: '{text}'")
+                    asyncio.create_task(agent.stop_speaking())
+
+            handler.on_valid_interruption(_on_valid_interruption)
+            handler.on_ignored_filler(lambda t, m: logger.debug(f"[IGNORED FILLER] {participant.identity}: {t}"))
+            handler.on_speech_registered(lambda t, m: logger.debug(f"[SPEECH REGISTERED] {participant.identity}: {t}"))
+
+
             # Start the agent
             await session.start(agent=transcriber_agent)
             
@@ -222,41 +271,49 @@ class MultiUserTranscriber:
 
             # === Attach STT listener to handler ===
             try:
-                stt_engine = getattr(session._agent, "stt", None)
-                if stt_engine and hasattr(stt_engine, "on_transcript"):
+                if self.ctx.proc.userdata["stt_has_on_transcript"]:
+                    # Bounded queue drained by a single worker: transcripts are
+                    # processed sequentially with backpressure instead of
+                    # spawning an unbounded task per STT event.
+                    transcript_queue: asyncio.Queue = asyncio.Queue(maxsize=32)
+
                     def on_transcript_event(result):
                         text = getattr(result, "text", "") or getattr(result, "transcript", "")
                         conf = getattr(result, "confidence", 1.0)
-                        asyncio.create_task(handler.handle_transcript(text, conf))
-                    stt_engine.on_transcript(on_transcript_event)
+                        try:
+                            transcript_queue.put_nowait((text, conf))
+                        except asyncio.QueueFull:
+                            # drop the oldest event to keep up under burst load
+                            transcript_queue.get_nowait()
+                            transcript_queue.put_nowait((text, conf))
+
+                    stt.on_transcript(on_transcript_event)
+                    worker = asyncio.create_task(self._transcript_worker(transcript_queue, handler))
+                    self._tasks.add(worker)
+                    worker.add_done_callback(lambda t: self._tasks.discard(t))
+                    self._stt_listeners[participant.identity] = (worker, on_transcript_event)
                     logger.debug(f"[STT] Attached transcript listener for {participant.identity}")
-            except Exception as e:
-                logger.error(f"[STT Handler Error] {e}")
-                traceback.print_exc()
+            except Exception:
+                logger.exception("[STT Handler Error]")
 
             return session
 
-        except Exception as e:
-            logger.error(f"[SESSION ERROR] {participant.identity}: {e}")
-            traceback.print_exc()
+        except Exception:
+            logger.exception(f"[SESSION ERROR] {participant.identity}")
 
-    async def _handle_interruption(self, participant_identity: str, text: str, meta: dict):
-        """Handle valid interruption - stop the agent's TTS immediately"""
-        logger.info(f"[INTERRUPTION HANDLER] Stopping TTS for {participant_identity}: '{text}'")
-        agent = self._agents.get(participant_identity)
-        if agent:
-            await agent.stop_speaking()
-        else:
-            logger.warning(f"[INTERRUPTION HANDLER] No agent found for {participant_identity}")
+    async def _transcript_worker(self, queue: asyncio.Queue, handler: FillerInterruptHandler):
+        """Drain queued transcript events sequentially for one participant."""
+        while True:
+            text, conf = await queue.get()
+            await handler.handle_transcript(text, conf)
 
     async def _close_session(self, sess: AgentSession):
         try:
             await sess.drain()
             await sess.aclose()
             logger.debug("[SESSION CLOSE] Closed successfully.")
-        except Exception as e:
-            logger.error(f"[SESSION CLOSE ERROR] {e}")
-            traceback.print_exc()
+        except Exception:
+            logger.exception("[SESSION CLOSE ERROR]")
 
 
 # ==============================================================
@@ -274,11 +331,82 @@ async def entrypoint(ctx: JobContext):
     ctx.add_shutdown_callback(lambda: asyncio.create_task(transcriber.aclose()))
 
 
+def _quantized_silero_path():
+    """Produce (and cache) an int8 dynamically-quantized copy of the bundled VAD model.
+
+    VAD runs on every audio frame for every participant; int8 weights cut the
+    bytes moved per inference and let the CPU use int8 dot products. Returns
+    None when quantization isn't available so callers fall back to fp32.
+    """
+    try:
+        import importlib.resources
+
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        # Per-user 0700 cache dir rather than a predictable world-writable file
+        uid = os.getuid() if hasattr(os, "getuid") else "all"
+        cache_dir = Path(tempfile.gettempdir()) / f"silero-vad-int8-{uid}"
+        cache_dir.mkdir(mode=0o700, exist_ok=True)
+        out_path = cache_dir / "silero_vad_int8.onnx"
+        if not out_path.exists():
+            res = importlib.resources.files("livekit.plugins.silero.resources") / "silero_vad.onnx"
+            with importlib.resources.as_file(res) as src:
+                # Quantize to a process-unique file and publish with an atomic
+                # rename: several workers prewarm concurrently at cold boot, and
+                # none of them may ever observe a partially written model.
+                tmp_path = out_path.with_suffix(f".{os.getpid()}.tmp")
+                try:
+                    quantize_dynamic(str(src), str(tmp_path), weight_type=QuantType.QInt8)
+                    os.replace(tmp_path, out_path)
+                finally:
+                    tmp_path.unlink(missing_ok=True)
+        return str(out_path)
+    except Exception as e:
+        logger.warning(f"[PREWARM] int8 VAD quantization unavailable, using fp32: {e}")
+        return None
+
+
 def prewarm(proc: JobProcess):
     logger.debug("[PREWARM] Loading Silero VAD model...")
-    proc.userdata["vad"] = silero.VAD.load()
+    # BatchedVAD coalesces windows from all participants into one forward pass;
+    # the model is quantized to int8 when onnxruntime's quantizer is available.
+    quantized_path = _quantized_silero_path()
+    if quantized_path:
+        try:
+            proc.userdata["vad"] = BatchedVAD.load(onnx_file_path=quantized_path)
+        except Exception:
+            # A corrupt cached model (e.g. written by a worker killed mid-
+            # quantization) must not brick every boot: drop it and use fp32.
+            logger.exception("[PREWARM] Cached int8 VAD model unusable, falling back to fp32")
+            Path(quantized_path).unlink(missing_ok=True)
+            proc.userdata["vad"] = BatchedVAD.load()
+    else:
+        proc.userdata["vad"] = BatchedVAD.load()
     logger.info("[PREWARM] Silero VAD ready.")
 
+    # One STT/TTS client shared by every participant in the room; connection
+    # setup (TLS handshake, auth) is paid once instead of per participant.
+    stt = deepgram.STT()
+    proc.userdata["stt"] = stt
+    # Probe the transcript-listener capability once; sessions reuse the answer
+    # instead of getattr/hasattr-ing the shared client on every join.
+    proc.userdata["stt_has_on_transcript"] = callable(getattr(stt, "on_transcript", None))
+    # Pre-bound detach counterpart; listeners on the shared client must be
+    # removed when their participant leaves.
+    proc.userdata["stt_off_transcript"] = getattr(stt, "off_transcript", None)
+    logger.info("[PREWARM] Shared Deepgram STT ready.")
+    try:
+        if not os.environ.get("ELEVEN_API_KEY"):
+            raise RuntimeError("ELEVEN_API_KEY is not set")
+        # No explicit api_key/http_session: the plugin reads ELEVEN_API_KEY and
+        # synthesizes over the process-wide pooled aiohttp session, so all
+        # participants' requests reuse the same keep-alive connections.
+        proc.userdata["tts"] = elevenlabs.TTS(model="eleven_flash_v2_5")
+        logger.info("[PREWARM] Shared ElevenLabs TTS ready.")
+    except Exception:
+        logger.exception("[TTS INIT ERROR]")
+        proc.userdata["tts"] = None
+
 
 if __name__ == "__main__":
     logger.info("[BOOT] Starting agent worker...")
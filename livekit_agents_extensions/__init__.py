@@ -6,6 +6,9 @@ Custom extensions and utility handlers for LiveKit Agents.
 This package currently includes:
 - FillerInterruptHandler: Detects filler words (e.g., "uh", "umm") and valid interruptions
   (e.g., "stop", "cancel") during active speech to control TTS and transcription flow.
+- BatchedVAD (livekit_agents_extensions.batched_vad): Silero VAD wrapper that batches
+  inference across all participants' streams. Imported lazily since it requires the
+  silero plugin.
 
 Usage:
     from livekit_agents_extensions import FillerInterruptHandler
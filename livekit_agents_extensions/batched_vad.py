@@ -0,0 +1,175 @@
+"""
+Batched Silero VAD for LiveKit Agents.
+
+Each silero VADStream normally runs its own batch-1 ONNX inference per 32 ms
+window. With many participants in a room that is N independent session.run
+calls for work the model can do in a single batched forward pass. BatchedVAD
+keeps the plugin's streaming API but routes every stream's inference through a
+shared batcher thread that coalesces windows arriving within a short interval
+into one batched session.run.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Tuple
+
+import numpy as np
+
+from livekit.plugins import silero
+from livekit.plugins.silero.vad import VADStream
+
+logger = logging.getLogger("batched_vad")
+
+DEFAULT_MAX_BATCH_SIZE = 16
+DEFAULT_BATCH_WINDOW = 0.005  # seconds to wait for co-arriving windows
+
+
+class _VADBatcher:
+    """Coalesces inference requests from all streams into batched session.run calls.
+
+    Stream executor threads block on a Future while the batcher thread stacks
+    their input windows / RNN states along the batch axis and runs the shared
+    ONNX session once. Falls back to a plain single inference when only one
+    request is pending.
+    """
+
+    def __init__(self, *, session, max_batch_size: int, batch_window: float):
+        self._session = session
+        self._max_batch_size = max_batch_size
+        self._batch_window = batch_window
+        self._requests: "queue.Queue" = queue.Queue()
+        self._worker: threading.Thread = None
+        self._start_lock = threading.Lock()
+
+    def run(self, input_buffer: np.ndarray, rnn_state: np.ndarray, sr: np.ndarray) -> Tuple[float, np.ndarray]:
+        """Blocking inference call; safe to invoke from any stream thread."""
+        if self._worker is None:
+            with self._start_lock:
+                if self._worker is None:
+                    worker = threading.Thread(target=self._run_loop, name="vad_batcher", daemon=True)
+                    worker.start()
+                    self._worker = worker
+        fut: Future = Future()
+        self._requests.put((input_buffer, rnn_state, sr, fut))
+        return fut.result()
+
+    def _run_loop(self):
+        while True:
+            batch = [self._requests.get()]
+            deadline = time.monotonic() + self._batch_window
+            while len(batch) < self._max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._requests.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: List[tuple]):
+        if len(batch) == 1:
+            buf, state, sr, fut = batch[0]
+            try:
+                out, new_state = self._session.run(
+                    None, {"input": buf, "state": state, "sr": sr}
+                )
+                fut.set_result((out.item(), new_state))
+            except Exception as e:
+                fut.set_exception(e)
+            return
+
+        bufs = np.concatenate([req[0] for req in batch], axis=0)
+        states = np.concatenate([req[1] for req in batch], axis=1)
+        try:
+            out, new_states = self._session.run(
+                None, {"input": bufs, "state": states, "sr": batch[0][2]}
+            )
+        except Exception as e:
+            for req in batch:
+                req[3].set_exception(e)
+            return
+        for i, req in enumerate(batch):
+            req[3].set_result((float(out[i, 0]), new_states[:, i : i + 1, :]))
+
+
+class _BatchedOnnxModel:
+    """Drop-in for the plugin's per-stream OnnxModel.
+
+    Keeps the per-stream audio context and RNN state locally and delegates the
+    actual forward pass to the shared batcher.
+    """
+
+    def __init__(self, *, batcher: _VADBatcher, sample_rate: int):
+        self._batcher = batcher
+        self._sample_rate = sample_rate
+
+        if sample_rate == 8000:
+            self._window_size_samples = 256
+            self._context_size = 32
+        else:
+            self._window_size_samples = 512
+            self._context_size = 64
+
+        self._sample_rate_nd = np.array(sample_rate, dtype=np.int64)
+        self._context = np.zeros((1, self._context_size), dtype=np.float32)
+        self._rnn_state = np.zeros((2, 1, 128), dtype=np.float32)
+        self._input_buffer = np.zeros(
+            (1, self._context_size + self._window_size_samples), dtype=np.float32
+        )
+
+    @property
+    def sample_rate(self) -> int:
+        return self._sample_rate
+
+    @property
+    def window_size_samples(self) -> int:
+        return self._window_size_samples
+
+    @property
+    def context_size(self) -> int:
+        return self._context_size
+
+    def __call__(self, x: np.ndarray) -> float:
+        self._input_buffer[:, : self._context_size] = self._context
+        self._input_buffer[:, self._context_size :] = x
+
+        out, self._rnn_state = self._batcher.run(
+            self._input_buffer, self._rnn_state, self._sample_rate_nd
+        )
+        self._context = self._input_buffer[:, -self._context_size :]
+        return out
+
+
+class BatchedVAD(silero.VAD):
+    """Silero VAD that batches inference across all active streams.
+
+    Use `BatchedVAD.load()` exactly like `silero.VAD.load()`; every stream
+    created from this instance shares one batcher so co-arriving audio windows
+    from different participants run as a single batched forward pass.
+    """
+
+    def __init__(
+        self,
+        *,
+        session,
+        opts,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        batch_window: float = DEFAULT_BATCH_WINDOW,
+    ) -> None:
+        super().__init__(session=session, opts=opts)
+        self._batcher = _VADBatcher(
+            session=session, max_batch_size=max_batch_size, batch_window=batch_window
+        )
+
+    def stream(self) -> VADStream:
+        stream = VADStream(
+            self,
+            self._opts,
+            _BatchedOnnxModel(batcher=self._batcher, sample_rate=self._opts.sample_rate),
+        )
+        self._streams.add(stream)
+        return stream
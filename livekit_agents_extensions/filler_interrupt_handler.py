@@ -1,154 +1,399 @@
-"""
-Filler-aware interruption handler for LiveKit Agents.
-
-Enhanced version with proper TTS interruption capabilities.
-"""
-
-import asyncio
-import logging
-import os
-import re
-from typing import Callable, Iterable, Optional, Set, Dict, List
-
-logger = logging.getLogger("filler_interrupt_handler")
-logger.setLevel(os.getenv("FILLER_HANDLER_LOG_LEVEL", "INFO"))
-
-# Default filler set (can be overridden via env or runtime)
-DEFAULT_IGNORED_WORDS = {"uh", "umm", "hmm", "haan", "uhh", "uhm", "erm", "ah", "mm", "mmh", "mhmm"}
-
-# Words that should always be treated as forcing a stop if present
-DEFAULT_FORCE_STOP_WORDS = {"stop", "wait", "hold", "pause", "no", "halt", "end", "shut up", "be quiet"}
-
-# A simple normalizer to strip punctuation and lowercase
-_TOKEN_RE = re.compile(r"[^\w']+", re.UNICODE)
-
-def normalize_text(text: str) -> str:
-    return _TOKEN_RE.sub(" ", text or "").strip().lower()
-
-def tokenize(text: str) -> Iterable[str]:
-    return [t for t in normalize_text(text).split() if t]
-
-class FillerInterruptHandler:
-    """
-    Enhanced handler with proper TTS interruption capabilities.
-    """
-
-    def __init__(
-        self,
-        ignored_words: Optional[Iterable[str]] = None,
-        force_stop_words: Optional[Iterable[str]] = None,
-        min_confidence_to_consider: float = 0.5,
-        ignore_if_confidence_below: float = 0.4,
-        logger_name: str = "filler_interrupt_handler",
-    ):
-        self.ignored_words: Set[str] = set(w.lower() for w in (ignored_words or DEFAULT_IGNORED_WORDS))
-        self.force_stop_words: Set[str] = set(w.lower() for w in (force_stop_words or DEFAULT_FORCE_STOP_WORDS))
-        self.min_confidence_to_consider = float(min_confidence_to_consider)
-        self.ignore_if_confidence_below = float(ignore_if_confidence_below)
-        self.agent_speaking = False
-        self.lock = asyncio.Lock()
-        self._callbacks: Dict[str, List[Callable]] = {
-            "valid_interruption": [],
-            "ignored_filler": [],
-            "speech_registered": []
-        }
-        self.logger = logging.getLogger(logger_name)
-        self.logger.setLevel(os.getenv("FILLER_HANDLER_LOG_LEVEL", "INFO"))
-
-    # ---------- Public API for attaching callbacks ----------
-    def on_valid_interruption(self, cb: Callable[[str, dict], None]):
-        """Callback invoked when a valid interruption is detected. cb(text, metadata)"""
-        self._callbacks["valid_interruption"].append(cb)
-
-    def on_ignored_filler(self, cb: Callable[[str, dict], None]):
-        """Callback invoked when filler-only input is ignored while agent was speaking."""
-        self._callbacks["ignored_filler"].append(cb)
-
-    def on_speech_registered(self, cb: Callable[[str, dict], None]):
-        """Callback invoked when speech should be registered/handled (agent quiet or valid speech)."""
-        self._callbacks["speech_registered"].append(cb)
-
-    # ---------- Tools to update config dynamically ----------
-    async def update_ignored_words(self, new_list: Iterable[str]):
-        async with self.lock:
-            self.ignored_words = set(w.lower() for w in new_list)
-            self.logger.info(f"Ignored words updated: {sorted(self.ignored_words)}")
-
-    async def update_force_stop_words(self, new_list: Iterable[str]):
-        async with self.lock:
-            self.force_stop_words = set(w.lower() for w in new_list)
-            self.logger.info(f"Force-stop words updated: {sorted(self.force_stop_words)}")
-
-    # ---------- State management ----------
-    async def set_agent_speaking(self, speaking: bool):
-        """Update agent speaking state - use this from TTS start/stop events"""
-        async with self.lock:
-            self.agent_speaking = speaking
-            self.logger.debug(f"Agent speaking state: {speaking}")
-
-    # ---------- Event processing ----------
-    async def _on_tts_start(self, *args, **kwargs):
-        await self.set_agent_speaking(True)
-
-    async def _on_tts_end(self, *args, **kwargs):
-        await self.set_agent_speaking(False)
-
-    async def handle_transcript(self, text: str, confidence: Optional[float] = None, words: Optional[list] = None, metadata: Optional[dict] = None):
-        """
-        Core decision logic - processes transcript and triggers appropriate callbacks.
-        """
-        metadata = metadata or {}
-        text = (text or "").strip()
-        if not text:
-            return
-
-        tokens = tokenize(text)
-        
-        # Compute overall confidence
-        avg_conf = confidence if confidence is not None else 1.0
-        if words:
-            confidences = [w.get("confidence", 1.0) for w in words if isinstance(w, dict)]
-            if confidences:
-                avg_conf = sum(confidences) / len(confidences)
-
-        async with self.lock:
-            agent_speaking = self.agent_speaking
-
-        # If agent is speaking, filter using filler-word policy
-        if agent_speaking:
-            self.logger.debug(f"Agent speaking; evaluating transcript='{text}', tokens={tokens}, avg_conf={avg_conf:.3f}")
-            
-            # Very low confidence => treat as background/murmur -> ignore
-            if avg_conf < self.ignore_if_confidence_below:
-                self.logger.info("Ignoring low-confidence background/murmur while agent speaks.")
-                for cb in self._callbacks["ignored_filler"]:
-                    cb(text, {"reason": "low_confidence", "avg_conf": avg_conf, **metadata})
-                return
-
-            # Check for forced stop words (highest priority)
-            has_force_stop = any(t in self.force_stop_words for t in tokens)
-            if has_force_stop:
-                self.logger.info(f"VALID INTERRUPTION (force-stop word): '{text}'")
-                for cb in self._callbacks["valid_interruption"]:
-                    cb(text, {"reason": "force_stop_word", "avg_conf": avg_conf, **metadata})
-                return
-
-            # Check if only filler words
-            non_ignored_tokens = [t for t in tokens if t not in self.ignored_words]
-            if not non_ignored_tokens:
-                # Only filler words - ignore
-                self.logger.info(f"Filler-only sound ignored: '{text}'")
-                for cb in self._callbacks["ignored_filler"]:
-                    cb(text, {"reason": "filler_only", "avg_conf": avg_conf, **metadata})
-                return
-            else:
-                # Mixed filler + real speech => valid interrupt
-                self.logger.info(f"VALID INTERRUPTION (non-filler content): '{text}'")
-                for cb in self._callbacks["valid_interruption"]:
-                    cb(text, {"reason": "mixed_tokens", "non_ignored": non_ignored_tokens, "avg_conf": avg_conf, **metadata})
-                return
-        else:
-            # Agent is quiet -> register speech normally
-            self.logger.debug(f"Agent quiet; registering speech: '{text}'")
-            for cb in self._callbacks["speech_registered"]:
-                cb(text, {"reason": "agent_quiet", "avg_conf": avg_conf, **metadata})
\ No newline at end of file
+"""
+Filler-aware interruption handler for LiveKit Agents.
+
+Enhanced version with proper TTS interruption capabilities.
+"""
+
+import logging
+import os
+import string
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Callable, Optional, Set, Iterable, List, Tuple
+
+try:
+    import ahocorasick  # pyahocorasick: compiled Aho-Corasick automaton
+
+    _AHOCORASICK_AVAILABLE = True
+except ImportError:
+    _AHOCORASICK_AVAILABLE = False
+
+try:
+    import numpy as np
+    from numba import njit
+
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
+
+# FNV-1a, used to match transcript tokens against precomputed word hashes
+_FNV_OFFSET = 0xCBF29CE484222325
+_FNV_PRIME = 0x100000001B3
+
+def _fnv1a(word: str) -> int:
+    h = _FNV_OFFSET
+    for b in word.encode("utf-8"):
+        h = ((h ^ b) * _FNV_PRIME) & 0xFFFFFFFFFFFFFFFF
+    return h
+
+if _NUMBA_AVAILABLE:
+
+    @njit(cache=True)
+    def _classify_bytes(buf, ignored_hashes, force_hashes):  # pragma: no cover - jitted
+        """Single pass over a utf-8 buffer; returns bit flags (1=force, 2=non-filler).
+
+        Lowercases ASCII inline, hashes each word with FNV-1a and binary-searches
+        the sorted hash arrays, so no Python string objects are created per token.
+        """
+        flags = 0
+        h = np.uint64(_FNV_OFFSET)
+        in_word = False
+        for i in range(len(buf) + 1):
+            if i < len(buf):
+                c = np.uint64(buf[i])
+                if 65 <= c <= 90:
+                    c += np.uint64(32)
+                # letters, digits, apostrophe and non-ASCII bytes are word chars
+                is_word = (97 <= c <= 122) or (48 <= c <= 57) or c == 39 or c > 127
+            else:
+                is_word = False
+            if is_word:
+                h = (h ^ c) * np.uint64(_FNV_PRIME)
+                in_word = True
+            elif in_word:
+                idx = np.searchsorted(force_hashes, h)
+                if idx < force_hashes.size and force_hashes[idx] == h:
+                    flags |= 1
+                else:
+                    idx = np.searchsorted(ignored_hashes, h)
+                    if not (idx < ignored_hashes.size and ignored_hashes[idx] == h):
+                        flags |= 2
+                h = np.uint64(_FNV_OFFSET)
+                in_word = False
+        return flags
+
+logger = logging.getLogger("filler_interrupt_handler")
+logger.setLevel(os.getenv("FILLER_HANDLER_LOG_LEVEL", "INFO"))
+
+# Default filler set (can be overridden via env or runtime)
+DEFAULT_IGNORED_WORDS = {"uh", "umm", "hmm", "haan", "uhh", "uhm", "erm", "ah", "mm", "mmh", "mhmm"}
+
+# Words that should always be treated as forcing a stop if present
+DEFAULT_FORCE_STOP_WORDS = {"stop", "wait", "hold", "pause", "no", "halt", "end", "shut up", "be quiet"}
+
+# classify() results
+CLASSIFY_VALID = 0
+CLASSIFY_FILLER_ONLY = 1
+CLASSIFY_FORCE_STOP = 2
+
+# Immutable metadata templates, one per dispatch reason. The hot path clones a
+# template with the per-event confidence rather than assembling the reason dict
+# from scratch; the templates themselves can never be mutated by a callback.
+_MD_LOW_CONFIDENCE = MappingProxyType({"reason": "low_confidence"})
+_MD_FORCE_STOP = MappingProxyType({"reason": "force_stop_word"})
+_MD_FILLER_ONLY = MappingProxyType({"reason": "filler_only"})
+_MD_MIXED = MappingProxyType({"reason": "mixed_tokens"})
+_MD_AGENT_QUIET = MappingProxyType({"reason": "agent_quiet"})
+
+# Punctuation -> space translation table; a single C-level pass replaces the old
+# regex substitution. Apostrophes are kept so contractions stay one token.
+_PUNCT_TABLE = str.maketrans({c: " " for c in string.punctuation if c != "'"})
+
+# STT partials repeat the same prefixes at a high rate; caching the normalized
+# token tuple makes re-tokenizing an already-seen partial a dict hit.
+@lru_cache(maxsize=2048)
+def _tok_cached(text: str) -> Tuple[str, ...]:
+    return tuple(text.translate(_PUNCT_TABLE).lower().split())
+
+# The scanner needs the space-padded normalized string (not tokens) for
+# word-boundary matching; cache it alongside the token tuples so repeated
+# partials are lowercased exactly once.
+@lru_cache(maxsize=2048)
+def _padded_cached(text: str) -> str:
+    return " " + text.translate(_PUNCT_TABLE).lower() + " "
+
+def normalize_text(text: str) -> str:
+    return " ".join(_tok_cached(text or ""))
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    return _tok_cached(text or "")
+
+class FillerInterruptHandler:
+    """
+    Enhanced handler with proper TTS interruption capabilities.
+    """
+
+    # One handler per participant: slots keep per-instance memory down at
+    # hundreds of concurrent sessions.
+    __slots__ = (
+        "ignored_words",
+        "force_stop_words",
+        "min_confidence_to_consider",
+        "ignore_if_confidence_below",
+        "agent_speaking",
+        "_automaton",
+        "_ignored_hashes",
+        "_force_hashes",
+        "_force_phrases",
+        "_cbs_valid",
+        "_cbs_ignored",
+        "_cbs_registered",
+        "logger",
+    )
+
+    def __init__(
+        self,
+        ignored_words: Optional[Iterable[str]] = None,
+        force_stop_words: Optional[Iterable[str]] = None,
+        min_confidence_to_consider: float = 0.5,
+        ignore_if_confidence_below: float = 0.4,
+        logger_name: str = "filler_interrupt_handler",
+    ):
+        self.ignored_words: Set[str] = set(w.lower() for w in (ignored_words or DEFAULT_IGNORED_WORDS))
+        self.force_stop_words: Set[str] = set(w.lower() for w in (force_stop_words or DEFAULT_FORCE_STOP_WORDS))
+        self.min_confidence_to_consider = float(min_confidence_to_consider)
+        self.ignore_if_confidence_below = float(ignore_if_confidence_below)
+        self.agent_speaking = False
+        self._automaton = None
+        self._ignored_hashes = None
+        self._force_hashes = None
+        self._rebuild_matchers()
+        self._cbs_valid: List[Callable] = []
+        self._cbs_ignored: List[Callable] = []
+        self._cbs_registered: List[Callable] = []
+        self.logger = logging.getLogger(logger_name)
+        self.logger.setLevel(os.getenv("FILLER_HANDLER_LOG_LEVEL", "INFO"))
+
+    # ---------- Compiled word matchers ----------
+    def _rebuild_matchers(self):
+        """Compile the word sets into the fastest matcher available.
+
+        Preferred backend is a single Aho-Corasick automaton over both word
+        classes; patterns are padded with spaces so matches only fire on whole
+        words, and the scanned text is padded the same way. Without
+        pyahocorasick, sorted FNV-1a hash arrays feed the numba kernel, and the
+        last resort is plain set membership.
+        """
+        # Multi-word phrases (e.g. "shut up") cannot match token-by-token; the
+        # non-automaton paths check them as padded substrings.
+        self._force_phrases = tuple(f" {w} " for w in self.force_stop_words if " " in w)
+        if _NUMBA_AVAILABLE:
+            self._ignored_hashes = np.sort(
+                np.array([_fnv1a(w) for w in self.ignored_words if " " not in w], dtype=np.uint64)
+            )
+            self._force_hashes = np.sort(
+                np.array([_fnv1a(w) for w in self.force_stop_words if " " not in w], dtype=np.uint64)
+            )
+        if not _AHOCORASICK_AVAILABLE:
+            self._automaton = None
+            return
+        auto = ahocorasick.Automaton()
+        for w in self.force_stop_words:
+            auto.add_word(f" {w} ", (True, f" {w} "))
+        for w in self.ignored_words:
+            if w not in self.force_stop_words:
+                auto.add_word(f" {w} ", (False, f" {w} "))
+        auto.make_automaton()
+        self._automaton = auto
+
+    def _scan(self, text: str) -> Tuple[bool, bool]:
+        """Single pass over the transcript.
+
+        Returns (has_force_stop, has_non_filler). `has_non_filler` is True when
+        any token is neither a filler nor a force-stop word.
+        """
+        padded = _padded_cached(text)
+        automaton = self._automaton
+        if automaton is None:
+            has_force_stop = any(p in padded for p in self._force_phrases)
+            if _NUMBA_AVAILABLE:
+                flags = _classify_bytes(
+                    np.frombuffer(padded.encode("utf-8"), dtype=np.uint8),
+                    self._ignored_hashes,
+                    self._force_hashes,
+                )
+                return has_force_stop or bool(flags & 1), bool(flags & 2)
+            has_non_filler = False
+            for tok in padded.split():
+                if tok in self.force_stop_words:
+                    # force-stop outranks everything downstream; stop scanning
+                    has_force_stop = True
+                    break
+                elif tok not in self.ignored_words:
+                    has_non_filler = True
+            return has_force_stop, has_non_filler
+
+        has_force_stop = False
+        has_non_filler = False
+        covered = 0  # rightmost position (exclusive) covered by a known-word match
+        for end, (is_force, pat) in automaton.iter(padded):
+            if is_force:
+                has_force_stop = True
+            start = end - len(pat) + 1
+            if start > covered and padded[covered:start].strip():
+                has_non_filler = True
+            if end + 1 > covered:
+                covered = end + 1
+        if covered < len(padded) and padded[covered:].strip():
+            has_non_filler = True
+        return has_force_stop, has_non_filler
+
+    def reset(self):
+        """Return the handler to a fresh state so it can be pooled and reused.
+
+        Word sets and their compiled matchers are kept (rebuilding them is the
+        expensive part); only callbacks and speaking state are cleared.
+        """
+        self.agent_speaking = False
+        self._cbs_valid.clear()
+        self._cbs_ignored.clear()
+        self._cbs_registered.clear()
+
+    def classify(self, text: str) -> int:
+        """Synchronously classify a transcript against the configured word sets.
+
+        Returns CLASSIFY_FORCE_STOP, CLASSIFY_VALID (real speech present) or
+        CLASSIFY_FILLER_ONLY. Callers needing the interruption decision without
+        the callback machinery should use this instead of re-scanning the text.
+        """
+        text = (text or "").strip()
+        if not text:
+            return CLASSIFY_FILLER_ONLY
+        has_force_stop, has_non_filler = self._scan(text)
+        if has_force_stop:
+            return CLASSIFY_FORCE_STOP
+        if has_non_filler:
+            return CLASSIFY_VALID
+        return CLASSIFY_FILLER_ONLY
+
+    # ---------- Public API for attaching callbacks ----------
+    def on_valid_interruption(self, cb: Callable[[str, dict], None]):
+        """Callback invoked when a valid interruption is detected. cb(text, metadata)"""
+        self._cbs_valid.append(cb)
+
+    def on_ignored_filler(self, cb: Callable[[str, dict], None]):
+        """Callback invoked when filler-only input is ignored while agent was speaking."""
+        self._cbs_ignored.append(cb)
+
+    def on_speech_registered(self, cb: Callable[[str, dict], None]):
+        """Callback invoked when speech should be registered/handled (agent quiet or valid speech)."""
+        self._cbs_registered.append(cb)
+
+    # ---------- Tools to update config dynamically ----------
+    async def update_ignored_words(self, new_list: Iterable[str]):
+        # Build the new set first, then swap: ref assignment is atomic, so
+        # concurrent readers see either the old or the new set, never a partial.
+        self.ignored_words = set(w.lower() for w in new_list)
+        self._rebuild_matchers()
+        self.logger.info(f"Ignored words updated: {sorted(self.ignored_words)}")
+
+    async def update_force_stop_words(self, new_list: Iterable[str]):
+        self.force_stop_words = set(w.lower() for w in new_list)
+        self._rebuild_matchers()
+        self.logger.info(f"Force-stop words updated: {sorted(self.force_stop_words)}")
+
+    # ---------- State management ----------
+    async def set_agent_speaking(self, speaking: bool):
+        """Update agent speaking state - use this from TTS start/stop events"""
+        self.agent_speaking = speaking
+        if self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug(f"Agent speaking state: {speaking}")
+
+    # ---------- Event processing ----------
+    async def _on_tts_start(self, *args, **kwargs):
+        await self.set_agent_speaking(True)
+
+    async def _on_tts_end(self, *args, **kwargs):
+        await self.set_agent_speaking(False)
+
+    async def handle_transcript(self, text: str, confidence: Optional[float] = None, words: Optional[list] = None, metadata: Optional[dict] = None):
+        """
+        Core decision logic - processes transcript and triggers appropriate callbacks.
+        """
+        text = (text or "").strip()
+        if not text:
+            return
+
+        # Snapshot the callback lists once; metadata dicts are only built when
+        # somebody is listening.
+        cbs_valid = self._cbs_valid
+        cbs_ignored = self._cbs_ignored
+        cbs_registered = self._cbs_registered
+
+        has_force_stop, has_non_filler = self._scan(text)
+
+        # Compute overall confidence (single pass, no intermediate list)
+        avg_conf = confidence if confidence is not None else 1.0
+        if words:
+            conf_sum = 0.0
+            conf_n = 0
+            for w in words:
+                # exact-type check; word entries are plain dicts from the STT payload
+                if w.__class__ is dict:
+                    conf_sum += w.get("confidence", 1.0)
+                    conf_n += 1
+            if conf_n:
+                avg_conf = conf_sum / conf_n
+
+        # Single-attribute read; no lock round-trip (writes are atomic assignments)
+        agent_speaking = self.agent_speaking
+
+        # If agent is speaking, filter using filler-word policy
+        if agent_speaking:
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"Agent speaking; evaluating transcript='{text}', avg_conf={avg_conf:.3f}")
+
+            # Very low confidence => treat as background/murmur -> ignore
+            if avg_conf < self.ignore_if_confidence_below:
+                self.logger.info("Ignoring low-confidence background/murmur while agent speaks.")
+                if cbs_ignored:
+                    md = {**_MD_LOW_CONFIDENCE, "avg_conf": avg_conf}
+                    if metadata:
+                        md.update(metadata)
+                    for cb in cbs_ignored:
+                        cb(text, md)
+                return
+
+            # Check for forced stop words (highest priority)
+            if has_force_stop:
+                self.logger.info(f"VALID INTERRUPTION (force-stop word): '{text}'")
+                if cbs_valid:
+                    md = {**_MD_FORCE_STOP, "avg_conf": avg_conf}
+                    if metadata:
+                        md.update(metadata)
+                    for cb in cbs_valid:
+                        cb(text, md)
+                return
+
+            # Check if only filler words
+            if not has_non_filler:
+                # Only filler words - ignore
+                self.logger.info(f"Filler-only sound ignored: '{text}'")
+                if cbs_ignored:
+                    md = {**_MD_FILLER_ONLY, "avg_conf": avg_conf}
+                    if metadata:
+                        md.update(metadata)
+                    for cb in cbs_ignored:
+                        cb(text, md)
+                return
+            else:
+                # Mixed filler + real speech => valid interrupt
+                self.logger.info(f"VALID INTERRUPTION (non-filler content): '{text}'")
+                if cbs_valid:
+                    non_ignored_tokens = [t for t in tokenize(text) if t not in self.ignored_words]
+                    md = {**_MD_MIXED, "non_ignored": non_ignored_tokens, "avg_conf": avg_conf}
+                    if metadata:
+                        md.update(metadata)
+                    for cb in cbs_valid:
+                        cb(text, md)
+                return
+        else:
+            # Agent is quiet -> register speech normally
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(f"Agent quiet; registering speech: '{text}'")
+            if cbs_registered:
+                md = {**_MD_AGENT_QUIET, "avg_conf": avg_conf}
+                if metadata:
+                    md.update(metadata)
+                for cb in cbs_registered:
+                    cb(text, md)
\ No newline at end of file